@@ -46,6 +46,9 @@ class Config:
             'area': [-5.0, 110.0, -45.0, 155.0],
             'save_grib': False,
             'save_netcdf': True,
+            'conversion_workers': 1,  # >1 converts members/steps in parallel
+            'conversion_memory_budget_mb': 1024,
+            'conversion_scratch_dir': None,  # e.g. /dev/shm, defaults to tmp
         }
         default_config: Dict[str, Any] = DEFAULT_DICT
         default_config.update(kwargs)
@@ -0,0 +1,174 @@
+import datetime
+import filecmp
+import logging
+import os
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from ecmwf_downloader import postprocess as pp
+from ecmwf_downloader.config.config import Config
+
+eccodes = pytest.importorskip('eccodes')
+cfgrib_dataset = pytest.importorskip('cfgrib.dataset')
+
+
+def write_grib(path, members=(1, 2, 3), steps=(0, 3, 6, 9), dlon=1.0):
+    """Writes a small 2t ensemble forecast (cf and pf) on a global grid."""
+    ni, nj = int(360 / dlon), int(180 / dlon) + 1
+    rng = np.random.default_rng(0)
+    with open(path, 'wb') as f:
+        for data_type, numbers in (('pf', members), ('cf', [0])):
+            for number in numbers:
+                for step in steps:
+                    h = eccodes.codes_grib_new_from_samples(
+                        'regular_ll_sfc_grib2')
+                    for key, value in (
+                        ('productDefinitionTemplateNumber', 1),
+                        ('setLocalDefinition', 1),
+                        ('localDefinitionNumber', 1),
+                        ('stream', 'enfo'),
+                        ('type', data_type),
+                        ('number', number),
+                        ('shortName', '2t'),
+                        ('dataDate', 20240101),
+                        ('dataTime', 0),
+                        ('step', step),
+                        ('Ni', ni),
+                        ('Nj', nj),
+                        ('iDirectionIncrementInDegrees', dlon),
+                        ('jDirectionIncrementInDegrees', dlon),
+                        ('latitudeOfFirstGridPointInDegrees', 90.0),
+                        ('longitudeOfFirstGridPointInDegrees', 0.0),
+                        ('latitudeOfLastGridPointInDegrees', -90.0),
+                        ('longitudeOfLastGridPointInDegrees', 360.0 - dlon),
+                        ('bitsPerValue', 16),
+                    ):
+                        eccodes.codes_set(h, key, value)
+                    eccodes.codes_set_values(h, 260 + 30 * rng.random(ni * nj))
+                    eccodes.codes_write(h, f)
+                    eccodes.codes_release(h)
+
+
+class FixedDatetime(datetime.datetime):
+    """Pins the timestamp cfgrib writes into the 'history' attribute."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def grib_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(cfgrib_dataset.datetime, 'datetime', FixedDatetime)
+    # Allow several workers on single-CPU machines
+    monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+    path = tmp_path / 'temp.grib'
+    write_grib(path)
+    return path
+
+
+def convert(grib_file, save_dir, workers, **kwargs):
+    config = Config(save_dir=str(save_dir),
+                    temp_filename=str(grib_file),
+                    type=['pf', 'cf'],
+                    name='2t',
+                    conversion_workers=workers,
+                    **kwargs)
+    date = pp.convert_and_crop_grib_to_netcdf(config)
+    return date, save_dir / '2t'
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'conversion_memory_budget_mb': 1}])
+def test_parallel_matches_serial(grib_file, tmp_path, kwargs):
+    serial_date, serial_dir = convert(grib_file, tmp_path / 'serial', 1)
+    parallel_date, parallel_dir = convert(grib_file, tmp_path / 'parallel', 2,
+                                          **kwargs)
+
+    assert serial_date == parallel_date == '20240101'
+    for name in ['pf_20240101.nc', 'cf_20240101.nc']:
+        assert filecmp.cmp(serial_dir / name, parallel_dir / name,
+                           shallow=False)
+
+
+def test_parallel_matches_serial_for_empty_crop(grib_file, tmp_path):
+    # South before north gives an empty latitude slice
+    area = [-45.0, 110.0, -5.0, 155.0]
+    _, serial_dir = convert(grib_file, tmp_path / 'serial', 1, area=area)
+    _, parallel_dir = convert(grib_file, tmp_path / 'parallel', 2, area=area)
+
+    for name in ['pf_20240101.nc', 'cf_20240101.nc']:
+        assert filecmp.cmp(serial_dir / name, parallel_dir / name,
+                           shallow=False)
+
+
+def test_parallel_leaves_no_scratch_files(grib_file, tmp_path):
+    scratch_dir = tmp_path / 'scratch'
+    scratch_dir.mkdir()
+    _, save_dir = convert(grib_file,
+                          tmp_path / 'parallel',
+                          2,
+                          conversion_scratch_dir=str(scratch_dir))
+
+    assert not list(scratch_dir.iterdir())
+    assert sorted(p.name for p in save_dir.iterdir()
+                  if p.suffix == '.nc') == ['cf_20240101.nc', 'pf_20240101.nc']
+
+
+def make_data_array(shape):
+    dims = ('number', 'step', 'latitude', 'longitude')[-len(shape):]
+    return xr.DataArray(np.zeros(shape, dtype='float32'), dims=dims, name='t2m')
+
+
+def test_partition_blocks_gives_every_worker_a_block():
+    da = make_data_array((67, 161, 181))
+    blocks = pp._partition_blocks(da, 4, 1440 * 721 * 4, 256 * 1024**2)
+
+    assert blocks == [(slice(0, 17), ), (slice(17, 34), ), (slice(34, 51), ),
+                      (slice(51, 67), )]
+
+
+def test_partition_blocks_respects_memory_budget():
+    da = make_data_array((2, 67, 161, 181))
+    full_field_bytes = 1440 * 721 * 4
+    field_bytes = 161 * 181 * 4
+    blocks = pp._partition_blocks(da, 4, full_field_bytes,
+                                  10 * (full_field_bytes + field_bytes))
+
+    assert len(blocks) == 2 * 7
+    assert all(block[1].stop - block[1].start <= 10 for block in blocks)
+    assert {block[0] for block in blocks} == {0, 1}
+
+
+def test_partition_blocks_warns_when_a_field_does_not_fit(caplog):
+    da = make_data_array((3, 161, 181))
+    with caplog.at_level(logging.WARNING):
+        blocks = pp._partition_blocks(da, 2, 1440 * 721 * 4, 1024)
+
+    assert blocks == [(slice(0, 1), ), (slice(1, 2), ), (slice(2, 3), )]
+    assert 'more than the' in caplog.text
+
+
+def test_partition_blocks_without_step_dimension():
+    assert pp._partition_blocks(make_data_array((161, 181)), 4, 1, 1) == [()]
+
+
+def test_partition_blocks_requires_trailing_latitude_longitude():
+    da = make_data_array((67, 161, 181)).transpose('latitude', 'step',
+                                                    'longitude')
+    with pytest.raises(ValueError):
+        pp._partition_blocks(da, 4, 1, 1)
+
+
+@pytest.mark.parametrize('value, expected', [(1, 1), ('2', 2), (8, 4)])
+def test_get_conversion_workers(monkeypatch, value, expected):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+    assert pp._get_conversion_workers({'conversion_workers': value
+                                      }) == expected
+
+
+@pytest.mark.parametrize('value', [0, -2, 'four'])
+def test_get_conversion_workers_rejects_invalid_values(value):
+    with pytest.raises(ValueError):
+        pp._get_conversion_workers({'conversion_workers': value})